@@ -1,10 +1,20 @@
 '''Supports data logging.'''
+import io
+import os
 import csv
+import mmap
+from functools import wraps
+from contextvars import ContextVar
 from typing import List, Tuple, Dict, Callable, Any
 from dataclasses import dataclass, field
 
+import numpy as np
+
 # from model.node import Node
 
+LOGGING: bool = os.environ.get('CABOODLE_LOG', '1').lower() not in ('0', 'false', 'off', 'no')
+'''Logging is on, unless the CABOODLE_LOG environment variable is 0, false, off or no when the model is imported.'''  # pylint: disable=line-too-long
+
 @dataclass
 class Log:
     '''
@@ -15,24 +25,69 @@ class Log:
     data_headers: Tuple[str] = field(default_factory=tuple)
 
     def flush(self, csv_path: str) -> None:
-        '''Write the data to a log file.'''
-        with open(csv_path, 'w', newline='', encoding='utf-8') as log_file:
-            writer = csv.writer(log_file)
-            writer.writerow(self.data_headers)
-            for row in self.data:
-                if isinstance(row, (tuple, list)):
-                    writer.writerow(row)
-                else:
-                    writer.writerow((row,))
+        '''
+        Write the data to a log file.
+
+        Numeric rows are written as floats,
+        so integer entries (i.e. an integer inflow series) are written as 1.0 not 1.
+        '''
+        log_buffer = io.StringIO(newline='')
+        writer = csv.writer(log_buffer)
+        writer.writerow(self.data_headers)
+        try:
+            rows = np.asarray(self.data, dtype=np.float64)
+        except (TypeError, ValueError):
+            # ragged or non-numeric rows.
+            rows = None
+        if rows is None or rows.ndim > 2:
+            # written in a single call by the csv module.
+            writer.writerows(row if isinstance(row, (tuple, list)) else (row,) for row in self.data)
+        else:
+            if rows.ndim == 1:
+                # single value entries.
+                rows = rows[:, np.newaxis]
+            # one format call for every value, '%r' matches the csv module float formatting.
+            row_format = ','.join(('%r',) * rows.shape[1]) + writer.dialect.lineterminator
+            log_buffer.write((row_format * len(rows)) % tuple(rows.ravel().tolist()))
+        content = log_buffer.getvalue().encode('utf-8')
+        if len(content) < MMAP_THRESHOLD:
+            with open(csv_path, 'wb') as log_file:
+                log_file.write(content)
+        else:
+            write_mapped(csv_path, content)
+
+MMAP_THRESHOLD: int = 1 << 24
+'''Size in bytes above which log files are written through a memory map.'''
+
+def write_mapped(path: str, content: bytes) -> None:
+    '''Write content to a file through a memory map, replacing any existing file.'''
+    with open(path, 'w+b') as file:
+        os.ftruncate(file.fileno(), len(content))
+        with mmap.mmap(file.fileno(), len(content)) as mapped:
+            mapped[:] = content
 
 def logger(function: Callable[...,Any]) -> Callable[..., Any]:
-    '''Logging decorator that wraps func (i.e. Reservoir.operate()) and stores the output.'''
-    is_initialized: bool = False
-    def wrapper(*args, log: Log = Log(), **kwargs):
-        output = function(*args, **kwargs)
-        if not is_initialized:
-            log.data_headers = args[0].output_headers
-            REGISTRY[args[0].name] = log
+    '''
+    Logging decorator that wraps func (i.e. Reservoir.operate()) and stores the output.
+
+    The log is passed positionally, by default each node logs to its own log.
+    Logs are looked up in the registry of the calling context on every entry,
+    a passed log is registered (and its headers set) in each context it is used in.
+    When LOGGING is off func is returned unwrapped.
+    '''
+    if not LOGGING:
+        return function
+    @wraps(function)
+    def wrapper(node: Any, log: Log | None = None) -> Any:
+        output = function(node)
+        logs = registry()
+        if log is None:
+            log = logs.get(node.name)
+            if log is None:
+                log = logs[node.name] = Log(data_headers=node.output_headers)
+        elif node.name not in logs:
+            log.data_headers = node.output_headers
+            logs[node.name] = log
         log.data.append(output)
         return output
     return wrapper
@@ -49,4 +104,14 @@ def logger(function: Callable[...,Any]) -> Callable[..., Any]:
 #         return wrapper
 #     return _logger
 
-REGISTRY: Dict[str, Log]  = {}
+REGISTRY: ContextVar[Dict[str, Log]] = ContextVar('registry')
+'''Logs keyed by node name, one registry per context (i.e. thread or scenario run).'''
+
+def registry() -> Dict[str, Log]:
+    '''Returns the log registry for the current context, creating it on first use.'''
+    try:
+        return REGISTRY.get()
+    except LookupError:
+        logs: Dict[str, Log] = {}
+        REGISTRY.set(logs)
+        return logs
@@ -11,11 +11,16 @@ System nodes.
 # these should be nodes that convert floating point numbers in to smaller integer values for gaming.
 # they should wrap a node, like the data nodes do.
 
+import math
+import operator
 from enum import Enum
+from functools import partial
 from dataclasses import dataclass, field
-from typing import List, Set, Tuple, Self, Protocol, Callable, Any
+from typing import List, Tuple, Self, Protocol, Callable, Any
 
-from model.data import Log, logger
+import numpy as np
+
+from model.data import Log, logger, LOGGING
 from model.reservoir import Reservoir
 
 class Tag(str, Enum):
@@ -35,20 +40,20 @@ class Tag(str, Enum):
 
 class Node(Protocol):
     '''A node in a system.'''
+    __slots__ = ()
     tag: Tag
     name: str
     #log: Optional[Log] = None
 
     '''The type of node.'''
-    def senders(self) -> Set[Self]:  # type: ignore
-        '''Return all nodes that send flow to this node.'''
+    senders: Tuple[Self,...]
+    '''All nodes that send flow to this node.'''
     def receive(self) -> float:  # type: ignore
         '''Return the flow received from all senders.'''
     def send(self) -> float:  # type: ignore
         '''Return the flow to send to downstream senders.'''
-    @property
-    def output_headers(self) -> Tuple[str]:  # type: ignore
-        '''Returns the headers for output data.'''
+    output_headers: Tuple[str,...]
+    '''The headers for output data.'''
     def output_function(self) -> Callable[..., Any]:  # type: ignore
         '''Returns the output function for this node.'''
 
@@ -62,6 +67,7 @@ class Node(Protocol):
 
 class Reciever(Protocol):
     '''A node that receives flow.'''
+    __slots__ = ()
     def add_sender(self, sender: Node) -> None:
         '''Add a node that sends flow to this node.'''
     def remove_sender(self, sender: Node) -> None:
@@ -69,20 +75,37 @@ class Reciever(Protocol):
 
 class Inflow(Node):
     '''A node that provides inflows from a dataset.'''
+    __slots__ = ('tag', 'name', 'senders', 'data', 'output_headers', '_values', '_timestep')
+
     def __init__(self, data: List[float], name: str = '', starting_position: int = 0) -> None:
         # logger: Callable[..., Any] = logger_factory()
         self.tag: Tag = Tag.INFLOW
         self.name: str = name if name else self.tag.value
-        self.data: List[float] = data
+        self.senders: Tuple[Node,...] = ()
+        self.data: np.ndarray = np.ascontiguousarray(data, dtype=np.float64)
+        self._values: List[float] = self.data.tolist()
+        '''A second copy of the data as python floats, indexing a list is faster than an array for single values.'''  # pylint: disable=line-too-long
+        self.output_headers: Tuple[str,...] = (self.tag.value,)
         #self.logger = logger
-        self.__timestep = starting_position
-
-    def senders(self) -> Set[Self]:
-        return set()
+        self._timestep = starting_position
 
     def receive(self) -> float:
-        self.__timestep += 1
-        return self.data[self.__timestep - 1]
+        timestep = self._timestep
+        self._timestep = timestep + 1
+        return self._values[timestep]
+
+    def receive_batch(self, n: int) -> np.ndarray:
+        '''
+        Return the next n inflows as a contiguous slice of the data.
+
+        Raises:
+            IndexError: If fewer than n inflows are left, like receive past the end of the data.
+        '''
+        start = self._timestep
+        if start + n > len(self.data):
+            raise IndexError(f'{n} inflows requested from timestep {start}, only {len(self.data) - start} left.')  # pylint: disable=line-too-long
+        self._timestep = start + n
+        return self.data[start:start + n]
 
     @logger
     def send(self) -> float:
@@ -90,17 +113,13 @@ class Inflow(Node):
 
     def reset(self) -> None:
         '''Reset the inflow to the starting timestep.'''
-        self.__timestep = 0
-
-    @property
-    def output_headers(self) -> Tuple[str]:
-        return (self.tag.value,)
+        self._timestep = 0
 
     def output_function(self) -> Callable[..., Any]:
         return self.send
 
-@dataclass
-class Storage(Node, Reciever):
+@dataclass(slots=True)
+class Storage(Node, Reciever):  # pylint: disable=too-many-instance-attributes
     '''A node that accepts inflows, stores water, and sends flow downstream.
 
     Args:
@@ -109,52 +128,61 @@ class Storage(Node, Reciever):
     '''
     volume: float = 0
     name: str = Tag.STORAGE.value
-    senders: Set[Node] = field(default_factory=set)
+    senders: Tuple[Node,...] = ()
+    '''Nodes that send flow to this node, in the order they are added.'''
     tag: Tag = field(init=False, default=Tag.STORAGE)
 
     reservoir: Reservoir = field(default_factory=Reservoir)
-
-    # def __post_init__(self) -> None:
-    #     self.output_headers = (self.tag.value, *self.reservoir.output_headers)  # type: ignore
+    _send_fns: Tuple[Callable[[], float],...] = field(init=False, repr=False, default=())
+    '''Bound send methods of the senders.'''
+    output_headers: Tuple[str,...] = field(init=False, repr=False, default=())
+    '''Inflow followed by the reservoir output headers, recomputed on reservoir assignment.'''
+    _outflow: float = field(init=False, repr=False, default=0.0)
+    '''Flow sent downstream by the last update.'''
+
+    def __post_init__(self) -> None:
+        self.output_headers = (Tag.INFLOW.value, *self.reservoir.output_headers)  # type: ignore
+        senders, self.senders = tuple(self.senders), ()
+        for sender in senders:
+            self.add_sender(sender)
 
     def add_sender(self, sender: Node) -> None:
         '''Add a node that sends flow to this node.'''
-        if sender in self.senders:
+        if any(node is sender for node in self.senders):
             raise ValueError(f'Redundant, {sender} already sends flow to {self}.')
-        self.senders.add(sender)
+        self.senders = (*self.senders, sender)
+        self._send_fns = (*self._send_fns, sender.send)
 
     def remove_sender(self, sender: Node) -> None:
         '''Remove a node that sends flow to this node.'''
-        self.senders.remove(sender)
+        senders = tuple(node for node in self.senders if node is not sender)
+        if len(senders) == len(self.senders):
+            raise KeyError(sender)
+        self.senders = senders
+        self._send_fns = tuple(node.send for node in senders)
 
     def receive(self) -> float:
         '''Return the flow received from all senders.'''
-        return sum(sender.send() for sender in self.senders)
+        return math.fsum(map(operator.call, self._send_fns))
 
     @logger
     def update(self) -> Tuple[float,...]:
-        '''Intermediary between receive and send to gather and log data.'''
+        '''
+        Receives inflow, operates the reservoir, and updates storage and outflow in one pass.
+
+        Returns:
+            Tuple[float,...]: inflow followed by the reservoir outflows, spill and storage.
+        '''
         inflow = self.receive()
         output = self.reservoir.operate(inflow + self.volume)
-        self.volume = self.storage(output)
-        return (inflow,) + output
+        self.volume = output[-1]
+        self._outflow = sum(output[:-2])
+        return (inflow, *output)
 
-    def send(self,*args, **kwargs) -> float:
+    def send(self, *args: Log) -> float:
         '''Return the flow to send to downstream senders.'''
-        outputs = self.update(*args, **kwargs)
-        return self.outflows(outputs)
-
-    def storage(self, output: Tuple[float,...]) -> float:
-        '''Returns the storage from a reservoir output.'''
-        return output[-1]
-
-    def outflows(self, output: Tuple[float,...]) -> float:
-        '''Returns the outflows from a reservoir output.'''
-        return sum(output[1:-2])
-
-    @property
-    def output_headers(self) -> Tuple[str]:
-        return (Tag.INFLOW.value, *self.reservoir.output_headers)  # type: ignore
+        self.update(*args)
+        return self._outflow
 
     def output_function(self) -> Callable[..., Any]:
         return self.update
@@ -170,37 +198,58 @@ class Storage(Node, Reciever):
     def __hash__(self) -> int:
         return hash((self.tag, self.name, self.reservoir))
 
-@dataclass
+# assigning a reservoir also recomputes the storage output headers.
+# a property over the slot, rather than __setattr__, keeps the per step volume updates direct.
+_reservoir_slot: Any = vars(Storage)['reservoir']
+
+def _set_reservoir(storage: Storage, reservoir: Reservoir) -> None:
+    '''Sets the storage reservoir and the output headers that follow from it.'''
+    _reservoir_slot.__set__(storage, reservoir)  # pylint: disable=unnecessary-dunder-call
+    storage.output_headers = (Tag.INFLOW.value, *reservoir.output_headers)  # type: ignore
+
+Storage.reservoir = property(_reservoir_slot.__get__, _set_reservoir)  # type: ignore
+
+@dataclass(slots=True)
 class Outlet(Node, Reciever):
     '''Node that sends flow out of the system.'''
     name: str = Tag.OUTLET.value
-    senders: Set[Node] = field(default_factory=set)
-    '''Nodes that send flow to this node.'''
+    senders: Tuple[Node,...] = ()
+    '''Nodes that send flow to this node, in the order they are added.'''
     tag: Tag = field(init=False, default=Tag.OUTLET)
+    _send_fns: Tuple[Callable[[], float],...] = field(init=False, repr=False, default=())
+    '''Bound send methods of the senders.'''
+    output_headers: Tuple[str,...] = field(init=False, repr=False, default=(Tag.OUTLET.value,))
+    '''The outlet flow header.'''
+
+    def __post_init__(self) -> None:
+        senders, self.senders = tuple(self.senders), ()
+        for sender in senders:
+            self.add_sender(sender)
 
     def add_sender(self, sender: Node) -> None:
         '''Add a node that sends flow to this node.'''
-        if sender in self.senders:
+        if any(node is sender for node in self.senders):
             raise ValueError(f'{sender} already sends flow to {self}.')
-        self.senders.add(sender)
+        self.senders = (*self.senders, sender)
+        self._send_fns = (*self._send_fns, sender.send)
 
     def remove_sender(self, sender: Node) -> None:
         '''Remove a node that sends flow to this node.'''
-        self.senders.remove(sender)
+        senders = tuple(node for node in self.senders if node is not sender)
+        if len(senders) == len(self.senders):
+            raise KeyError(sender)
+        self.senders = senders
+        self._send_fns = tuple(node.send for node in senders)
 
     def receive(self) -> float:
         '''Return the flow received from all senders.'''
-        return sum(sender.send() for sender in self.senders)
+        return math.fsum(map(operator.call, self._send_fns))
 
     @logger
     def send(self) -> float:
         '''Return the flow to send to downstream senders.'''
         return self.receive()
 
-    @property
-    def output_headers(self) -> Tuple[str]:
-        return (self.tag.value,)
-
     def output_function(self) -> Callable[..., Any]:
         return self.send
 
@@ -215,12 +264,32 @@ class Outlet(Node, Reciever):
         return hash((self.tag, self.name))
 
 class DataNode(Node):
-    '''Logging support.'''
+    '''
+    Logging support, other attributes are looked up on the wrapped node.
+    Records to log only when logging is on (see model.data.LOGGING), otherwise sends unlogged.
+    '''
+    __slots__ = ('node', 'tag', 'name', 'output_headers', 'log', '_send')
+
     def __init__(self, node: Node, logpath: str) -> None:
         self.node = node
         self.tag = node.tag
         self.name = node.name
-        self.log = Log(logpath, data_headers=node.output_headers)
+        self.output_headers = node.output_headers
+        self.log = Log(logpath, data_headers=self.output_headers)
+        self._send: Callable[[], float] = partial(node.send, self.log) if LOGGING else node.send  # type: ignore # pylint: disable=line-too-long
+        '''Wrapped node send, bound to the log once.'''
+
+    def __getattr__(self, name: str) -> Any:
+        if name == 'node':
+            # node is not set yet (i.e. during copy), avoids infinite recursion.
+            raise AttributeError(name)
+        return getattr(self.node, name)
+
+    def receive(self) -> float:
+        return self.node.receive()
 
     def send(self) -> float: # type: ignore
-        self.node.send(log=self.log) # type: ignore
+        return self._send()
+
+    def output_function(self) -> Callable[..., Any]:
+        return self.node.output_function()
@@ -11,6 +11,17 @@ import numpy as np
 
 from model.asset import Asset
 
+try:
+    from numba import njit
+    NUMBA: bool = True
+except ImportError:  # numba is optional, kernels run as plain python without it.
+    NUMBA = False
+    def njit(*args: Any, **kwargs: Any) -> Any:  # pylint: disable=unused-argument
+        '''Stands in for numba.njit, returns the function uncompiled.'''
+        if args and callable(args[0]):
+            return args[0]
+        return lambda function: function
+
 ReleaseRange = NamedTuple('ReleaseRange', [('min', float), ('max', float)])
 
 class Outlet(Protocol):
@@ -288,6 +299,125 @@ def passive_management(reservoir: 'Reservoir',
         return tuple(output)
     return operate
 
+def pack_outlets(reservoir: 'Reservoir',
+                 sorter: Callable[[Tuple[Outlet,...]], Tuple[int,...]]) -> Tuple[np.ndarray, np.ndarray]:  # pylint: disable=line-too-long
+    '''
+    Packs the reservoir outlets into location and maximum release arrays, in operating order.
+    Failed closed outlets are packed with a maximum release of 0.
+
+    Args:
+        reservoir (Reservoir): The reservoir with outlets to pack.
+        sorter (Callable[[List[Outlet]], List[int]]):
+            Function that sorts outlet indices in operating order.
+
+    Raises:
+        NotImplementedError:
+            If an outlet does not use the basic_gate or basic_gate_with_failure release function.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The outlet locations and maximum releases.
+    '''
+    outlets = tuple(reservoir.outlets[i] for i in sorter(reservoir.outlets))
+    for outlet in outlets:
+        # pylint: disable=protected-access
+        if outlet._release_function not in (basic_gate, basic_gate_with_failure):
+            raise NotImplementedError(f'{outlet._release_function} cannot be packed.')
+    locations = np.array([outlet.location for outlet in outlets], dtype=np.float64)
+    max_releases = np.array([0.0 if getattr(outlet, 'failure_state', FailureState.NONE) is FailureState.CLOSED  # pylint: disable=line-too-long
+                             else outlet.design_range.max for outlet in outlets], dtype=np.float64)
+    return locations, max_releases
+
+@njit(cache=True, nogil=True)
+def passive_kernel(volume: float, locations: np.ndarray, max_releases: np.ndarray,
+                   capacity: float, output: np.ndarray) -> float:
+    '''
+    Fills output with releases, spill and storage from a starting volume, returns the storage.
+    The jit compiled equivalent of passive_management operate for basic gates,
+    compiled without the GIL so reservoirs can be operated from parallel threads.
+
+    Args:
+        volume (float): Volume of water to manage at beginning of timestep.
+        locations (np.ndarray): Outlet locations, in operating order.
+        max_releases (np.ndarray): Maximum outlet releases, in operating order.
+        capacity (float): Reservoir capacity.
+        output (np.ndarray): Filled with outflows in operating order, followed by spill and storage.
+            Length is number of outlets + 2.
+
+    Returns:
+        float: The reservoir storage.
+    '''
+    n = len(locations)
+    for i in range(n):
+        release = min(max(volume - locations[i], 0.0), max_releases[i])
+        output[i] = release
+        volume -= release
+    output[n] = max(0.0, volume - capacity)
+    output[n + 1] = min(volume, capacity)
+    return output[n + 1]
+
+def compiled_management(reservoir: 'Reservoir',
+                        sorter: Callable[[Tuple[Outlet,...]], Tuple[int,...]] = outlet_index_sorter()) -> Callable[[float], Tuple[float,...]]:  # pylint: disable=line-too-long
+    '''Returns storage and releases from a reservoir with passive management, using a compiled kernel.
+
+    Outlets are sorted and packed into arrays once,
+    so changes to the reservoir outlets after this call are not seen by the operate function.
+    The kernel is only compiled when numba is installed (see NUMBA), otherwise it runs as plain python.
+
+    Args:
+        # pylint: disable=line-too-long
+        reservoir (Reservoir): The reservoir to operate.
+        sorter (Callable[[List[Outlet]], List[int]], optional): Function that sorts outlet indices in operating order. Defaults to outlet_index_sorter().
+
+    Raises:
+        NotImplementedError: If an outlet does not use the basic_gate or basic_gate_with_failure release function.
+
+    Returns:
+        Callable[[float], Tuple[float,...]]:
+            A function that returns releases, spill and storage from a reservoir given a starting volume.
+    '''
+    locations, max_releases = pack_outlets(reservoir, sorter)
+    capacity = float(reservoir.capacity)
+    # filled by the kernel on every call, read back as python floats.
+    output = np.empty(len(locations) + 2, dtype=np.float64)
+    def operate(volume: float) -> Tuple[float,...]:
+        '''Returns releases, spill and storage from a reservoir given a starting volume.'''
+        passive_kernel(volume, locations, max_releases, capacity, output)
+        return tuple(output.tolist())
+    return operate
+
+def specialized_management(reservoir: 'Reservoir',
+                           sorter: Callable[[Tuple[Outlet,...]], Tuple[int,...]] = outlet_index_sorter()) -> Callable[[float], Tuple[float,...]]:  # pylint: disable=line-too-long
+    '''Returns storage and releases from a reservoir with passive management, using generated code.
+
+    The operate function is generated for the reservoir's outlets,
+    with the loop over outlets unrolled and outlet parameters inlined as constants.
+    Changes to the reservoir outlets after this call are not seen by the operate function.
+
+    Args:
+        # pylint: disable=line-too-long
+        reservoir (Reservoir): The reservoir to operate.
+        sorter (Callable[[List[Outlet]], List[int]], optional): Function that sorts outlet indices in operating order. Defaults to outlet_index_sorter().
+
+    Raises:
+        NotImplementedError: If an outlet does not use the basic_gate or basic_gate_with_failure release function.
+
+    Returns:
+        Callable[[float], Tuple[float,...]]:
+            A function that returns releases, spill and storage from a reservoir given a starting volume.
+    '''
+    locations, max_releases = pack_outlets(reservoir, sorter)
+    capacity = float(reservoir.capacity)
+    lines = ['def operate(volume):']
+    for i, (location, max_release) in enumerate(zip(locations.tolist(), max_releases.tolist())):
+        lines.append(f'    release{i} = min(max(volume - {location!r}, 0.0), {max_release!r})')
+        lines.append(f'    volume -= release{i}')
+    releases = ''.join(f'release{i}, ' for i in range(len(locations)))
+    spill, storage = f'max(0.0, volume - {capacity!r})', f'min(volume, {capacity!r})'
+    lines.append(f'    return ({releases}{spill}, {storage})')
+    namespace: Dict[str, Any] = {'inf': math.inf}
+    exec('\n'.join(lines), namespace)  # pylint: disable=exec-used
+    return namespace['operate']
+
 class Reservoir:
     '''A reservoir.'''
     def __init__(self, name: str = '',
@@ -1,7 +1,7 @@
 '''A system of nodes and edges describing a water resources system.'''
 from typing import Set, List
 
-from model.data import REGISTRY
+from model.data import registry
 from model.node import Node, Tag
 
 class System:
@@ -28,7 +28,7 @@ class System:
         '''Simulate the system.'''
         for _ in range(time_periods):
             self.step_forward()
-        for k, v in REGISTRY.items():
+        for k, v in registry().items():
             v.flush(csv_path=f'{self.data_path}/{k}.csv')
 
     def step_forward(self) -> None:
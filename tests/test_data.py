@@ -1,9 +1,15 @@
 '''Tests the data module.'''
 
+import os
 import unittest
+import tempfile
+from contextvars import Context
+from unittest.mock import patch
 
-from model.data import Log
-from model.node import Inflow
+from model.data import Log, write_mapped, registry, logger, LOGGING
+from model.node import Inflow, Storage, Outlet, DataNode
+from model.reservoir import Reservoir, BasicOutlet
+from model.system import System
 
 class TestLog(unittest.TestCase):
     '''Test the log class.'''
@@ -19,9 +25,77 @@ class TestLog(unittest.TestCase):
         '''Test that the default data headers is an empty tuple.'''
         self.assertEqual((), Log().data_headers)
 
+    def test_flush_ragged_rows(self):
+        '''Test that flush writes rows of different widths through the csv module.'''
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'log.csv')
+            Log(data=[(1.0, 0.0), (2.0, 1.0, 0.5), 3.0], data_headers=('a', 'b')).flush(csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as log_file:
+                self.assertEqual('a,b\r\n1.0,0.0\r\n2.0,1.0,0.5\r\n3.0\r\n', log_file.read())
+
+    def test_flush_single_values(self):
+        '''Test that flush writes single value entries as one column rows.'''
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'log.csv')
+            Log(data=[1.0, 2.0], data_headers=('a',)).flush(csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as log_file:
+                self.assertEqual('a\r\n1.0\r\n2.0\r\n', log_file.read())
+
+    def test_flush_writes_integer_entries_as_floats(self):
+        '''Test that flush writes integer entries, like an integer inflow series, as floats.'''
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'log.csv')
+            Log(data=[1, 2], data_headers=('a',)).flush(csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as log_file:
+                self.assertEqual('a\r\n1.0\r\n2.0\r\n', log_file.read())
+
+    def test_flush(self):
+        '''Test that flush writes headers and rows.'''
+        log = Log(data=[(1.0, 0.0), (2.0, 1.0)], data_headers=('a', 'b'))
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'log.csv')
+            log.flush(csv_path)
+            with open(csv_path, newline='', encoding='utf-8') as log_file:
+                self.assertEqual('a,b\r\n1.0,0.0\r\n2.0,1.0\r\n', log_file.read())
+
+    def test_flush_above_mmap_threshold_writes_through_memory_map(self):
+        '''Test that flush writes through a memory map above MMAP_THRESHOLD.'''
+        log = Log(data=[(1.0, 0.0), (2.0, 1.0)], data_headers=('a', 'b'))
+        with tempfile.TemporaryDirectory() as directory, \
+             patch('model.data.MMAP_THRESHOLD', 1), \
+             patch('model.data.write_mapped', wraps=write_mapped) as mapped:
+            csv_path = os.path.join(directory, 'log.csv')
+            log.flush(csv_path)
+            mapped.assert_called_once()
+            with open(csv_path, newline='', encoding='utf-8') as log_file:
+                self.assertEqual('a,b\r\n1.0,0.0\r\n2.0,1.0\r\n', log_file.read())
+
+class TestWriteMapped(unittest.TestCase):
+    '''Tests the write_mapped function.'''
+    def test_write_mapped_replaces_file_content(self):
+        '''Test that write_mapped replaces an existing file with the content.'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'log.csv')
+            with open(path, 'wb') as file:
+                file.write(b'a longer previous file')
+            write_mapped(path, b'a,b\r\n')
+            with open(path, 'rb') as file:
+                self.assertEqual(b'a,b\r\n', file.read())
+
+class TestRegistry(unittest.TestCase):
+    '''Tests the registry function.'''
+    def test_registry_returns_same_registry_in_context(self):
+        '''Test that the registry function returns the same registry within a context.'''
+        self.assertIs(registry(), registry())
+
+    def test_registry_is_separate_in_new_context(self):
+        '''Test that a new context gets its own registry.'''
+        self.assertIsNot(registry(), Context().run(registry))
+
 class TestLogger(unittest.TestCase):
     '''Tests the logger decorator.'''
 
+    @unittest.skipUnless(LOGGING, 'logging is off (CABOODLE_LOG).')
     def test_logger(self):
         '''Test that the logger decorator stores the output of a function.'''
         log = Log()
@@ -31,3 +105,76 @@ class TestLogger(unittest.TestCase):
         inflow.send(log=log)
         inflow.send(log=log)
         self.assertEqual([1, 2, 3], log.data)
+
+    @unittest.skipUnless(LOGGING, 'logging is off (CABOODLE_LOG).')
+    def test_logger_registers_log_on_first_entry(self):
+        '''Test that the logger decorator registers the log and sets its headers.'''
+        log = Log()
+        inflow = Inflow(data=[1, 2, 3], name='registered')
+        # pylint: disable=unexpected-keyword-arg
+        inflow.send(log=log)
+        self.assertIs(log, registry()['registered'])
+        self.assertEqual(inflow.output_headers, log.data_headers)
+
+    @unittest.skipUnless(LOGGING, 'logging is off (CABOODLE_LOG).')
+    def test_logger_logs_each_node_separately(self):
+        '''Test that storages with different output widths log separately.'''
+        def scenario(directory: str) -> None:
+            inflow1 = Inflow(data=[1, 2, 3], name='i1')
+            inflow2 = Inflow(data=[1, 2, 3], name='i2')
+            storage1 = Storage(name='s1', senders=(inflow1,))
+            outlets = (BasicOutlet(location=1.0), BasicOutlet(location=0.5))
+            storage2 = Storage(name='s2', senders=(inflow2,), reservoir=Reservoir(outlets=outlets))
+            outlet = Outlet(senders=(storage1, storage2))
+            nodes = [inflow1, inflow2, storage1, storage2, outlet]
+            System(nodes=nodes, log_directory=directory).simulate(3)
+        with tempfile.TemporaryDirectory() as directory:
+            Context().run(scenario, directory)
+            widths = {}
+            for name in ('s1', 's2'):
+                csv_path = os.path.join(directory, f'{name}.csv')
+                with open(csv_path, newline='', encoding='utf-8') as log_file:
+                    rows = log_file.read().splitlines()[1:]
+                widths[name] = {len(row.split(',')) for row in rows}
+        self.assertEqual({'s1': {4}, 's2': {5}}, widths)
+
+    @unittest.skipUnless(LOGGING, 'logging is off (CABOODLE_LOG).')
+    def test_simulate_flushes_same_named_storages_of_different_widths(self):
+        '''Test that storages sharing the default name, and so one log, still flush.'''
+        def scenario(directory: str) -> None:
+            storage1 = Storage(senders=(Inflow(data=[1, 2, 3], name='i1'),))
+            outlets = (BasicOutlet(location=1.0), BasicOutlet(location=0.5))
+            storage2 = Storage(senders=(Inflow(data=[1, 2, 3], name='i2'),),
+                               reservoir=Reservoir(outlets=outlets))
+            outlet = Outlet(senders=(storage1, storage2))
+            nodes = [*storage1.senders, *storage2.senders, storage1, storage2, outlet]
+            System(nodes=nodes, log_directory=directory).simulate(1)
+        with tempfile.TemporaryDirectory() as directory:
+            Context().run(scenario, directory)
+            csv_path = os.path.join(directory, 'storage.csv')
+            with open(csv_path, newline='', encoding='utf-8') as log_file:
+                rows = log_file.read().splitlines()[1:]
+        self.assertEqual([4, 5], [len(row.split(',')) for row in rows])
+
+    @unittest.skipUnless(LOGGING, 'logging is off (CABOODLE_LOG).')
+    def test_logger_populates_registry_of_each_context(self):
+        '''Test that nodes log to the registry of the context they run in.'''
+        inflow = Inflow(data=[1, 2, 3], name='inflow')
+        data_node = DataNode(Inflow(data=[4, 5, 6], name='wrapped'), logpath='')
+        def scenario() -> dict:
+            inflow.send()
+            data_node.send()
+            return registry()
+        first, second = Context().run(scenario), Context().run(scenario)
+        self.assertIsNot(first, second)
+        for logs in (first, second):
+            self.assertEqual({'inflow', 'wrapped'}, set(logs))
+        self.assertEqual(([1], [2]), (first['inflow'].data, second['inflow'].data))
+        self.assertIs(data_node.log, second['wrapped'])
+
+    def test_logger_off_returns_function_unwrapped(self):
+        '''Test that the logger decorator returns the function itself when logging is off.'''
+        def function(node):
+            return node
+        with patch('model.data.LOGGING', False):
+            self.assertIs(function, logger(function))
@@ -2,6 +2,8 @@
 # pylint: disable=line-too-long
 import unittest
 
+import numpy as np
+
 from model.asset import Asset
 import model.reservoir as res
 
@@ -217,3 +219,68 @@ class TestReservoir(unittest.TestCase):
                                 res.BasicOutlet(name='a', location=0.0, design_range=res.ReleaseRange(0, 0)))).operate(3.0)
         expected = (0.0, 0.5, 0.0, 0.5, 1.0, 1.0)
         self.assertEqual(expected, actual)
+
+class TestCompiledManagement(unittest.TestCase):
+    '''Tests for the compiled_management operations function.'''
+    def test_compiled_management_default_reservoir_storage_eq_2_returns_outlet_eq_1_spill_eq_0_storage_eq_1(self):
+        '''Test that the compiled operate function returns outlet eq 1, spill eq 0 and storage eq 1 when given the default reservoir with storage eq 2.'''
+        self.assertEqual((1.0, 0.0, 1.0), res.Reservoir(operations_fx=res.compiled_management).operate(2.0))
+
+    def test_compiled_management_returns_python_floats_from_each_call(self):
+        '''Test that the compiled operate function returns a new tuple of python floats on each call, not a view of its buffer.'''
+        reservoir = res.Reservoir(operations_fx=res.compiled_management)
+        first = reservoir.operate(2.0)
+        self.assertEqual(((1.0, 0.0, 1.0), (0.0, 0.0, 0.5)), (first, reservoir.operate(0.5)))
+        self.assertEqual({float}, {type(value) for value in first})
+
+    @unittest.skipUnless(res.NUMBA, 'numba is not installed, the kernel runs as plain python.')
+    def test_compiled_management_kernel_is_compiled(self):
+        '''Test that the passive kernel is a compiled numba dispatcher and matches passive management.'''
+        self.assertTrue(hasattr(res.passive_kernel, 'signatures'))
+        compiled = res.Reservoir(operations_fx=res.compiled_management).operate(3.0)
+        self.assertEqual(res.Reservoir().operate(3.0), compiled)
+        self.assertTrue(res.passive_kernel.signatures)
+
+    def test_compiled_management_matches_passive_management(self):
+        '''Test that the compiled operate function returns the same outputs as passive management for an assortment of basic and asset outlets.'''
+        outlets = (res.OutletAsset(Asset(), name='b', location=1.0, failure_state=res.FailureState.OPEN, design_range=res.ReleaseRange(0.0, 0.5)),
+                   res.BasicOutlet(name='b', location=0.0, design_range=res.ReleaseRange(0.0, 0.5)),
+                   res.OutletAsset(Asset(), name='a', location=1.0, failure_state=res.FailureState.CLOSED),
+                   res.BasicOutlet(name='a', location=0.0, design_range=res.ReleaseRange(0, 0)))
+        passive = res.Reservoir(outlets=outlets)
+        compiled = res.Reservoir(outlets=outlets, operations_fx=res.compiled_management)
+        for volume in (0.0, 0.5, 1.0, 2.0, 3.0, 10.0):
+            with self.subTest(volume=volume):
+                self.assertEqual(passive.operate(volume), compiled.operate(volume))
+
+    def test_compiled_management_custom_release_function_raises_not_implemented_error(self):
+        '''Test that the compiled_management function raises a NotImplementedError for an outlet with a custom release function.'''
+        outlet = res.BasicOutlet(location=1.0, _release_function=lambda outlet, volume: res.ReleaseRange(0.0, volume))
+        with self.assertRaises(NotImplementedError):
+            res.Reservoir(outlets=(outlet,), operations_fx=res.compiled_management)
+
+class TestSpecializedManagement(unittest.TestCase):
+    '''Tests for the specialized_management operations function.'''
+    def test_specialized_management_default_reservoir_storage_eq_2_returns_outlet_eq_1_spill_eq_0_storage_eq_1(self):
+        '''Test that the specialized operate function returns outlet eq 1, spill eq 0 and storage eq 1 when given the default reservoir with storage eq 2.'''
+        self.assertEqual((1.0, 0.0, 1.0), res.Reservoir(operations_fx=res.specialized_management).operate(2.0))
+
+    def test_specialized_management_matches_passive_management(self):
+        '''Test that the specialized operate function returns the same outputs as passive management for an assortment of basic and asset outlets.'''
+        outlets = (res.OutletAsset(Asset(), name='b', location=1.0, failure_state=res.FailureState.OPEN, design_range=res.ReleaseRange(0.0, 0.5)),
+                   res.BasicOutlet(name='b', location=0.0, design_range=res.ReleaseRange(0.0, 0.5)),
+                   res.OutletAsset(Asset(), name='a', location=1.0, failure_state=res.FailureState.CLOSED),
+                   res.BasicOutlet(name='a', location=0.0, design_range=res.ReleaseRange(0, 0)))
+        passive = res.Reservoir(outlets=outlets)
+        specialized = res.Reservoir(outlets=outlets, operations_fx=res.specialized_management)
+        for volume in (0.0, 0.5, 1.0, 2.0, 3.0, 10.0):
+            with self.subTest(volume=volume):
+                self.assertEqual(passive.operate(volume), specialized.operate(volume))
+
+class TestPassiveKernel(unittest.TestCase):
+    '''Tests for the passive_kernel function.'''
+    def test_passive_kernel_fills_output_and_returns_storage(self):
+        '''Test that the passive_kernel function fills output with outlet, spill and storage and returns storage.'''
+        output = np.empty(3)
+        storage = res.passive_kernel(3.0, np.array([1.0]), np.array([0.5]), 1.0, output)
+        self.assertEqual(([0.5, 1.5, 1.0], 1.0), (output.tolist(), storage))